@@ -1,6 +1,20 @@
+import abc
+import typing
+import functools
+import linecache
 import unittest
+from unittest import mock
+import typecheck as typecheck_module
 from typecheck import typecheck, typecheck_plus, InvalidArgumentType
 
+
+def logged(f):
+    # A decorator hiding the signature of the decorated function behind *args.
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        return f(*args, **kwargs)
+    return wrapper
+
 class TestTypeCheck(unittest.TestCase):
 
     def test_any_type(self):
@@ -147,5 +161,375 @@ class TestTypeCheck(unittest.TestCase):
             Person.h(language=17)
 
 
+    def test_typecheck_first_argument_not_skipped(self):
+
+        """
+        Tests that the first argument of a plain function is checked even
+        when the value passed exposes an attribute with the same name as the
+        function being decorated.
+        """
+
+        class Holder(object):
+            describe = 'not a method'
+
+        @typecheck(Holder, int)
+        def describe(holder, times):
+            return holder.describe * times
+
+        try:
+            describe(Holder(), 2)
+        except InvalidArgumentType:
+            self.fail("Failed typecheck while it shouldn't have, given both arguments have valid types.")
+        with self.assertRaises(InvalidArgumentType):
+            describe(Holder(), '2')
+
+    def test_invalid_argument_type_message(self):
+
+        """
+        Tests that the message of the InvalidArgumentType exception describes
+        the failed argument and its valid types.
+        """
+
+        @typecheck(int, (int, float))
+        def add(x, y):
+            return x + y
+
+        with self.assertRaises(InvalidArgumentType) as context:
+            add(1, '2')
+        self.assertEqual(str(context.exception), "Argument y (2: str) must be of one type of int, float.")
+        with self.assertRaises(InvalidArgumentType) as context:
+            add('1', 2)
+        self.assertEqual(str(context.exception), "Argument x (1: str) must be of type int.")
+
+    def test_typecheck_disabled(self):
+
+        """
+        Tests that when type checks are disabled, the decorated function is
+        returned unchanged and no check is performed.
+        """
+
+        def to_string(x):
+            return str(x)
+
+        enabled = typecheck_module.enabled
+        typecheck_module.enabled = False
+        try:
+            decorated = typecheck(int)(to_string)
+        finally:
+            typecheck_module.enabled = enabled
+
+        self.assertIs(decorated, to_string)
+        try:
+            decorated('42')
+        except InvalidArgumentType:
+            self.fail("Failed typecheck while it shouldn't have, given type checks were disabled.")
+
+    def test_typecheck_disabled_environment_values(self):
+
+        """
+        Tests that only truthy values of the TYPECHECK_DISABLED environment
+        variable disable type checks.
+        """
+
+        for value in ('1', 'true', 'True', 'yes', 'on'):
+            self.assertTrue(typecheck_module._is_truthy(value))
+        for value in (None, '', '0', 'false', 'False', 'no', 'off'):
+            self.assertFalse(typecheck_module._is_truthy(value))
+
+    def test_typing_forms(self):
+
+        """
+        Tests that typing forms are supported as valid types, with unions and
+        optionals accepting any of their members and generics checked against
+        their origin.
+        """
+
+        @typecheck(typing.List[int], typing.Union[int, str], label=typing.Optional[str], extra=typing.Any)
+        def describe(values, key, label=None, extra=None):
+            return '{} {} {}'.format(values, key, label)
+
+        try:
+            describe([1, 2], 1)
+            describe([1, 2], 'a', label='numbers', extra=object())
+            describe([], 1, label=None)
+        except InvalidArgumentType:
+            self.fail("Failed typecheck while it shouldn't have, given all calls have valid types.")
+        with self.assertRaises(InvalidArgumentType):
+            describe((1, 2), 1)
+        with self.assertRaises(InvalidArgumentType):
+            describe([1, 2], 1.5)
+        with self.assertRaises(InvalidArgumentType):
+            describe([1, 2], 1, label=42)
+
+        @typecheck((int, (str, bytes)))
+        def to_string(x):
+            return str(x)
+
+        try:
+            to_string(1)
+            to_string('a')
+            to_string(b'a')
+        except InvalidArgumentType:
+            self.fail("Failed typecheck while it shouldn't have, given nested tuples of types are valid.")
+        with self.assertRaises(InvalidArgumentType):
+            to_string(1.5)
+
+    def test_typecheck_returns_value(self):
+
+        """
+        Tests that the decorated function returns the value returned by the
+        original function.
+        """
+
+        @typecheck(int, int, prompt=str)
+        def sum_string(x, y, prompt='The sum of {} and {} is {}.'):
+            return prompt.format(str(x), str(y), str(x+y))
+
+        self.assertEqual(sum_string(1, 2), 'The sum of 1 and 2 is 3.')
+        self.assertEqual(sum_string(1, 2, prompt='{} + {} = {}'), '1 + 2 = 3')
+
+    def test_typecheck_on_variable_arguments(self):
+
+        """
+        Tests that the typecheck decorator checks functions only taking variable
+        arguments, such as the wrappers of other decorators, by position, while
+        still excluding the "self" argument of instance methods.
+        """
+
+        @typecheck(int, str)
+        @logged
+        def repeat(times, text):
+            return text * times
+
+        class Greeter(object):
+
+            @typecheck(str)
+            @logged
+            def greet(self, name):
+                return 'Hello, {}.'.format(name)
+
+        try:
+            self.assertEqual(repeat(2, 'a'), 'aa')
+            self.assertEqual(Greeter().greet('Juan'), 'Hello, Juan.')
+        except InvalidArgumentType:
+            self.fail("Failed typecheck while it shouldn't have, given all calls have valid types.")
+        with self.assertRaises(InvalidArgumentType):
+            repeat('a', 2)
+        with self.assertRaises(InvalidArgumentType):
+            Greeter().greet(42)
+
+    def test_typecheck_on_variable_arguments_methods(self):
+
+        """
+        Tests that the "self" and "cls" arguments are excluded for methods only
+        taking variable arguments when inherited, when being class methods and
+        when decorated with typecheck more than once, whereas the first argument
+        of a plain function is never excluded.
+        """
+
+        class Base(object):
+
+            @typecheck(str)
+            @logged
+            def greet(self, name):
+                return 'Hello, {}.'.format(name)
+
+            @classmethod
+            @typecheck(int)
+            @logged
+            def make(cls, value):
+                return cls()
+
+            @typecheck(int)
+            @typecheck(None, str)
+            def repeat(self, times, text):
+                return text * times
+
+        class Child(Base):
+            pass
+
+        @typecheck(set, int)
+        @logged
+        def add(values, value):
+            return values | {value}
+
+        try:
+            self.assertEqual(Child().greet('x'), 'Hello, x.')
+            self.assertIsInstance(Base.make(1), Base)
+            self.assertIsInstance(Child.make(1), Child)
+            self.assertEqual(Child().repeat(2, 'a'), 'aa')
+            self.assertEqual(add({1}, 2), {1, 2})
+        except InvalidArgumentType:
+            self.fail("Failed typecheck while it shouldn't have, given all calls have valid types.")
+        with self.assertRaises(InvalidArgumentType):
+            Child().greet(42)
+        with self.assertRaises(InvalidArgumentType):
+            Base.make('1')
+        with self.assertRaises(InvalidArgumentType):
+            Child().repeat('2', 'a')
+        with self.assertRaises(InvalidArgumentType):
+            Child().repeat(2, 3)
+        with self.assertRaises(InvalidArgumentType):
+            add(2, {1})
+
+    def test_typecheck_on_variable_arguments_memoised(self):
+
+        """
+        Tests that whether the first argument of a function only taking variable
+        arguments is exempt is determined once per class of that argument (or
+        per class, for class methods), rather than upon each call.
+        """
+
+        with mock.patch.object(typecheck_module, '_is_bound_argument', wraps=typecheck_module._is_bound_argument) as is_bound_argument:
+
+            class Greeter(object):
+
+                @typecheck(str)
+                @logged
+                def greet(self, name):
+                    return 'Hello, {}.'.format(name)
+
+                @classmethod
+                @typecheck(int)
+                @logged
+                def make(cls, value):
+                    return cls()
+
+            for _ in range(3):
+                Greeter().greet('Juan')
+                Greeter.make(1)
+            self.assertEqual(is_bound_argument.call_count, 2)
+            with self.assertRaises(InvalidArgumentType):
+                Greeter().greet(42)
+            self.assertEqual(is_bound_argument.call_count, 2)
+
+    def test_typecheck_honours_isinstance(self):
+
+        """
+        Tests that arguments are accepted whenever isinstance accepts them,
+        including mocks, runtime checkable protocols and classes registered
+        to an abstract base class after a failed check.
+        """
+
+        @typing.runtime_checkable
+        class Named(typing.Protocol):
+            name: str
+
+        class Person(object):
+            name = 'Juan'
+
+        class Shape(abc.ABC):
+            pass
+
+        class Square(object):
+            pass
+
+        @typecheck(int, Named, Shape)
+        def describe(x, named, shape):
+            return named.name
+
+        with self.assertRaises(InvalidArgumentType):
+            describe(1, Person(), Square())
+        Shape.register(Square)
+        try:
+            describe(mock.Mock(spec=int), Person(), Square())
+        except InvalidArgumentType:
+            self.fail("Failed typecheck while it shouldn't have, given isinstance accepts all arguments.")
+        with self.assertRaises(InvalidArgumentType):
+            describe(1, object(), Square())
+
+    def test_typecheck_preserves_metadata(self):
+
+        """
+        Tests that the decorated function keeps the name, qualified name,
+        module and docstring of the original function.
+        """
+
+        def to_string(x):
+            """Converts x to a string."""
+            return str(x)
+
+        decorated = typecheck(int)(to_string)
+        self.assertEqual(decorated.__name__, 'to_string')
+        self.assertEqual(decorated.__qualname__, to_string.__qualname__)
+        self.assertEqual(decorated.__module__, __name__)
+        self.assertEqual(decorated.__doc__, 'Converts x to a string.')
+        self.assertIs(decorated.__wrapped__, to_string)
+
+    def test_typecheck_line_cache_bounded(self):
+
+        """
+        Tests that repeatedly decorating functions with the same qualified
+        name does not grow the line cache.
+        """
+
+        typecheck(int)(lambda x: x)
+        size = len(linecache.cache)
+        for _ in range(100):
+            typecheck(int)(lambda x: x)
+        self.assertEqual(len(linecache.cache), size)
+
+    def test_typecheck_on_bound_method(self):
+
+        """
+        Tests that the typecheck decorator applied to a bound method checks
+        its arguments, the instance being already bound.
+        """
+
+        class Person(object):
+
+            def rename(self, first_name):
+                return first_name
+
+        rename = typecheck(str)(Person().rename)
+        try:
+            self.assertEqual(rename('Juan'), 'Juan')
+        except InvalidArgumentType:
+            self.fail("Failed typecheck on bound method while it shouldn't have.")
+        with self.assertRaises(InvalidArgumentType):
+            rename(42)
+
+    def test_typing_forms_without_class_origin(self):
+
+        """
+        Tests that typing forms which can not be checked at runtime, as well
+        as unhashable specifications, are rejected with a TypeError upon
+        decoration.
+        """
+
+        for valid_types in (typing.Literal[1], typing.TypeVar('T'), typing.NewType('UserId', int), 'int', (int, 'str'), [int, str], (int, [str])):
+            with self.assertRaisesRegex(TypeError, 'Invalid type specification'):
+                typecheck(valid_types)
+
+    def test_typecheck_on_class_and_callable_instance(self):
+
+        """
+        Tests that the typecheck decorator applied to a class or to a callable
+        instance checks the arguments of their construction and call, the
+        "self" argument not being passed by the caller.
+        """
+
+        class Person(object):
+
+            def __init__(self, first_name):
+                self.first_name = first_name
+
+        class Greeter(object):
+
+            def __call__(self, first_name):
+                return 'Hello, {}.'.format(first_name)
+
+        make = typecheck(str)(Person)
+        greet = typecheck(str)(Greeter())
+        try:
+            self.assertEqual(make('Juan').first_name, 'Juan')
+            self.assertEqual(greet('Juan'), 'Hello, Juan.')
+        except InvalidArgumentType:
+            self.fail("Failed typecheck while it shouldn't have, given all calls have valid types.")
+        with self.assertRaises(InvalidArgumentType):
+            make(42)
+        with self.assertRaises(InvalidArgumentType):
+            greet(42)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,13 +1,33 @@
-import six
+import os
+import types
+import typing
 import inspect
+import linecache
+import functools
+
+
+def _is_truthy(value):
+    # Environment variables are deemed set when holding e.g. "1" or "true", whereas
+    # values such as "0", "false" or an empty string are deemed unset.
+    return (value or '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Type checks are meant for debugging; setting the TYPECHECK_DISABLED environment
+# variable to a truthy value (1, true, yes, on), or setting this flag to False before
+# decorating, makes the decorators return the functions as they are, with no wrapper
+# and no overhead upon calls.
+enabled = not _is_truthy(os.environ.get('TYPECHECK_DISABLED'))
+
 
 class InvalidArgumentType(Exception):
+
+    __slots__ = ('argument_index_or_name', 'argument', 'valid_types')
     
     def __init__(self, argument_index_or_name, argument, valid_types):
 
         """
-        Initialises the exception to be thrown in case of a failed type check
-        with an informative message.
+        Initialises the exception to be thrown in case of a failed type check;
+        the informative message is only built when the exception is printed.
 
         Args
             argument_index_or_name: int or str
@@ -19,77 +39,302 @@ class InvalidArgumentType(Exception):
                 The tuple of valid types which the argument can take.
         """
 
-        super(InvalidArgumentType, self).__init__(
-            "Argument {} ({}: {}) {}.".format(
-                str(argument_index_or_name),
-                str(argument),
-                str(argument.__class__.__name__),
-                (
-                    "must be of type {}".format(str(valid_types[0].__name__))
-                    if len(valid_types) == 1
-                    else "must be of one type of {}".format(', '.join(str(x.__name__) for x in valid_types))
-                )
+        super(InvalidArgumentType, self).__init__(argument_index_or_name, argument, valid_types)
+        self.argument_index_or_name = argument_index_or_name
+        self.argument = argument
+        self.valid_types = valid_types
+
+    def __str__(self):
+        # The message is only formatted when actually consumed, rather than upon raising.
+        return "Argument {} ({}: {}) {}.".format(
+            str(self.argument_index_or_name),
+            str(self.argument),
+            str(self.argument.__class__.__name__),
+            (
+                "must be of type {}".format(str(self.valid_types[0].__name__))
+                if len(self.valid_types) == 1
+                else "must be of one type of {}".format(', '.join(str(x.__name__) for x in self.valid_types))
             )
         )
 
 
-class _typecheck(object):
+_MATCHING_TYPES = set()
+_MATCHING_TYPES_MAXSIZE = 512
 
-    def __init__(self, on_invalid, *args, **kwargs):
 
-        """
-        Initialises the base _typecheck decorator.
+def _types_match(argument, valid_types):
+    # A successful subclass check only depends on the type of the argument, hence
+    # it is memoised; this avoids walking the MRO, or running a Python level
+    # __subclasscheck__ in the case of abstract base classes, on repeated calls.
+    # Failures are never memoised and fall back to isinstance, which honours
+    # __class__ (e.g. mocks), __instancecheck__ (e.g. protocols) and ABCs with
+    # subclasses registered after the first check.
+    key = (type(argument), valid_types)
+    if key in _MATCHING_TYPES:
+        return True
+    try:
+        matched = issubclass(key[0], valid_types)
+    except TypeError:
+        matched = False
+    if matched:
+        if len(_MATCHING_TYPES) >= _MATCHING_TYPES_MAXSIZE:
+            _MATCHING_TYPES.clear()
+        _MATCHING_TYPES.add(key)
+        return True
+    return isinstance(argument, valid_types)
 
-        Args
-            on_invalid: function
-                Callback function specifying the behaviour upon a failed type
-                check; receives (arg:object, nameOrIndex:str or int, valid_types:tuple(type,)).
-            args: tuple(type or tuple(type,))
-                Specify the allowed type(s) for each of the function arguments;
-            kwargs: dict(arg_name:str, type or tuple(types,))
-                Specify the allowed type(s) for each of the function arguments;
-        """
 
-        self._on_invalid = on_invalid
-        self.arg_types = tuple((t if not t or isinstance(t, tuple) else tuple([t])) for t in args)
-        self.kwarg_types = {k: (t if not t or isinstance(t, tuple) else tuple([t])) for k, t in six.iteritems(kwargs)}
-
-    def __call__(self, f):
-
-        def _should_skip_first_argument(f, args):
-            # Attempts to determine if the first argument should be avoided in the check;
-            # this would be the case with instance and class methods, as the first argument
-            # always refers to the instance and class, respectively. To do so, it checks
-            # if the argument contains an anttribute with the name of the function being
-            # decorated; the result would however be incorrect if the first argument 
-            # is a valid argument, but it is an object which contains a symbol with the
-            # same name as the function being decorated; requires improvement.
-            return bool(getattr(args[0], f.__name__, None))
-        
-        def _wrapper(*args, **kwargs):
-            orig_args = tuple(args)
-            should_skip_first_argument = _should_skip_first_argument(f, args)
-            if six.PY3: argument_names = inspect.getfullargspec(f).args
-            else: argument_names = [str(i) for i in range(len(args))]
-            args = tuple(args[1:] if should_skip_first_argument else args)
-            argument_names = tuple(argument_names[1:] if should_skip_first_argument else argument_names)
-            
-            for i, (argument, argument_name, valid_types) in enumerate(zip(args, argument_names, self.arg_types)):
-                self._check(argument, argument_name, valid_types)
-            for k, v in six.iteritems(kwargs):
-                if k in self.kwarg_types:
-                    self._check(v, k, self.kwarg_types[k])
+_MISSING = object()
 
-            f(*orig_args, **kwargs)
-            
-        return _wrapper
-    
-    def _check(self, argument, argument_index_or_name, valid_types):
-        if valid_types and not isinstance(argument, valid_types):
-            self._on_invalid(argument, argument_index_or_name, valid_types)
+
+def _is_bound_argument(argument, name, wrapper):
+    # Whether the argument is the instance (or class) the wrapper is bound to as an
+    # instance (or class) method; the attribute is looked up in the dictionaries of
+    # the classes along the MRO, without resolving descriptors, and the entry found
+    # is compared with the wrapper by identity, through any other decorator on top.
+    for cls in (argument.__mro__ if isinstance(argument, type) else type(argument).__mro__):
+        entry = cls.__dict__.get(name)
+        if entry is None:
+            continue
+        if isinstance(argument, type):
+            if not isinstance(entry, classmethod):
+                return False
+            entry = entry.__func__
+        elif isinstance(entry, (classmethod, staticmethod)):
+            return False
+        return inspect.unwrap(entry, stop=lambda g: g is wrapper) is wrapper
+    return False
+
+
+def _compile_wrapper(f, checks_pos, offset, checks_kw, on_invalid):
+
+    """
+    Generates and compiles the wrapper of a decorated function, specialised
+    for its checks: the check of each positional and keyword argument is
+    unrolled into a straight-line statement referencing its valid types
+    directly, with no loop over the argument specifications and no attribute
+    lookups, before the decorated function is called.
+
+    Args
+        f: function
+            The function being decorated.
+        checks_pos: tuple((index:int, name:str or int, valid_types:tuple(type,)),)
+            The positional arguments to be checked, with their index among
+            the checked arguments, their name (or index) and their valid types.
+        offset: int or None
+            The number of leading positional arguments exempt from the check;
+            if None, it is determined upon each call (see below).
+        checks_kw: tuple((name:str, valid_types:tuple(type,)),)
+            The keyword arguments to be checked, with their valid types.
+        on_invalid: function
+            Callback function specifying the behaviour upon a failed type check.
+
+    Returns
+        function: the wrapper of the decorated function.
+    """
+
+    namespace = {'f': f, 'on_invalid': on_invalid, '_types_match': _types_match, '_MISSING': _MISSING}
+
+    def _mismatch(value, key, valid_types):
+        # Binds the valid types in the namespace and returns the failure condition
+        # for the value; a single valid type is checked against the bare type,
+        # whereas multiple ones are first looked up in a set.
+        namespace['types_{}'.format(key)] = valid_types
+        if len(valid_types) == 1:
+            namespace['type_{}'.format(key)] = valid_types[0]
+            return 'type({0}) is not type_{1} and not _types_match({0}, type_{1})'.format(value, key)
+        namespace['type_set_{}'.format(key)] = frozenset(valid_types)
+        return 'type({0}) not in type_set_{1} and not _types_match({0}, types_{1})'.format(value, key)
+
+    lines = ['def _wrapper(*args, **kwargs):']
+    if checks_pos:
+        lines.append('    n = len(args)')
+    if checks_pos and offset is None:
+        # The signature does not tell whether the function is a method (e.g. it is
+        # hidden by another decorator); the first argument is exempt if it is the
+        # instance or class to which this very wrapper is bound. The outcome only
+        # depends on the class of the first argument (or on the argument itself, if
+        # a class), hence it is memoised, costing a single lookup on repeated calls.
+        namespace['_is_bound_argument'] = _is_bound_argument
+        namespace['bound_arguments'] = {}
+        lines.append('    o = 0')
+        lines.append('    if n:')
+        lines.append('        a = args[0]')
+        lines.append('        key = a if isinstance(a, type) else type(a)')
+        lines.append('        o = bound_arguments.get(key)')
+        lines.append('        if o is None:')
+        lines.append('            o = bound_arguments[key] = 1 if _is_bound_argument(a, {!r}, _wrapper) else 0'.format(getattr(f, '__name__', None)))
+    for i, (index, argument_name, valid_types) in enumerate(checks_pos):
+        position = 'o + {}'.format(index) if offset is None else str(index + offset)
+        value = 'args[{}]'.format(position)
+        lines.append('    if n > {} and {}:'.format(position, _mismatch(value, i, valid_types)))
+        lines.append('        on_invalid({}, {!r}, types_{})'.format(value, argument_name, i))
+    # The specified keyword arguments are fixed and usually few, whereas the
+    # call may supply many; the former are probed for in the latter.
+    for i, (k, valid_types) in enumerate(checks_kw):
+        key = 'kw_{}'.format(i)
+        lines.append('    v = kwargs.get({!r}, _MISSING)'.format(k))
+        lines.append('    if v is not _MISSING and {}:'.format(_mismatch('v', key, valid_types)))
+        lines.append('        on_invalid(v, {!r}, types_{})'.format(k, key))
+    lines.append('    return f(*args, **kwargs)')
+
+    # The source is registered in the line cache for tracebacks to display it, under
+    # one filename per qualified name, so that repeated decorations (e.g. within a
+    # function body) overwrite the same entry; the wrapper then takes the name,
+    # module and docstring of the decorated function.
+    source = '\n'.join(lines) + '\n'
+    filename = '<typecheck {}.{}>'.format(getattr(f, '__module__', None), getattr(f, '__qualname__', type(f).__qualname__))
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    namespace['__name__'] = getattr(f, '__module__', None)
+    exec(compile(source, filename, 'exec'), namespace)
+    return functools.update_wrapper(namespace['_wrapper'], f)
+
+
+_UnionType = getattr(types, 'UnionType', None)
+
+
+_INVALID_TYPE_SPECIFICATION = (
+    "Invalid type specification {!r}: only classes, tuples of classes and typing "
+    "forms with a class origin (e.g. Union, Optional, List[int]) are supported."
+)
+
+
+def _normalize_type(valid_types):
+    # Unhashable specifications (e.g. lists) can not be looked up in the cache and
+    # are not valid anyway; they are rejected with the same message as other ones.
+    try:
+        hash(valid_types)
+    except TypeError:
+        raise TypeError(_INVALID_TYPE_SPECIFICATION.format(valid_types)) from None
+    return _normalize_hashable_type(valid_types)
 
 
-class typecheck(_typecheck):
+@functools.lru_cache(maxsize=256)
+def _normalize_hashable_type(valid_types):
+
+    """
+    Normalises the specification of the valid types of an argument into a
+    tuple of concrete types, suitable for subclass checks; typing forms are
+    collapsed, with Union[A, B] (or A | B) becoming (A, B), Optional[A]
+    becoming (A, NoneType) and generics such as List[int] becoming their
+    origin, as their parameters can not be checked at runtime.
+
+    Args
+        valid_types: type or tuple(type or tuple,) or typing form
+            The valid type(s) for the argument, as specified to the decorator;
+            tuples may be nested, as accepted by isinstance.
+
+    Returns
+        tuple(type,): the valid types; empty if any type is valid (e.g. Any).
+
+    Raises
+        TypeError: if the specification contains anything but classes or
+            typing forms with a class origin (e.g. Literal, TypeVar).
+    """
+
+    normalized = []
+    for t in (valid_types if isinstance(valid_types, tuple) else (valid_types,)):
+        if t is typing.Any:
+            return ()
+        if t is None:
+            t = type(None)
+        origin = typing.get_origin(t)
+        if isinstance(t, tuple):
+            nested = _normalize_type(t)
+        elif origin is typing.Union or (_UnionType is not None and origin is _UnionType):
+            nested = _normalize_type(typing.get_args(t))
+        elif origin is getattr(typing, 'Annotated', None):
+            nested = _normalize_type(typing.get_args(t)[0])
+        else:
+            nested = (t if origin is None else origin,)
+            # Forms with no class origin (e.g. Literal, TypeVar, NewType or forward
+            # references) can not be checked at runtime; they are rejected upon
+            # decoration, rather than failing upon each call.
+            if not isinstance(nested[0], type):
+                raise TypeError(_INVALID_TYPE_SPECIFICATION.format(t))
+        if not nested:
+            return ()
+        normalized.extend(nested)
+    return tuple(dict.fromkeys(normalized))
+
+
+def _raise_on_invalid(argument, argument_index_or_name, valid_types):
+    raise InvalidArgumentType(argument_index_or_name, argument, valid_types)
+
+
+def _typecheck(on_invalid, *args, **kwargs):
+
+    """
+    Creates the base _typecheck decorator; its state is held by the closure
+    rather than by instance attributes.
+
+    Args
+        on_invalid: function
+            Callback function specifying the behaviour upon a failed type
+            check; receives (arg:object, nameOrIndex:str or int, valid_types:tuple(type,)).
+        args: tuple(type or tuple(type,) or typing form)
+            Specify the allowed type(s) for each of the function arguments;
+        kwargs: dict(arg_name:str, type or tuple(types,) or typing form)
+            Specify the allowed type(s) for each of the function arguments;
+
+    Returns
+        function: the decorator, receiving the function to be decorated.
+    """
+
+    # Arguments with no type specified (None or Any) are filtered out once, here; the
+    # positional ones are identified by index, as their names are not known yet.
+    normalized_args = ((i, _normalize_type(t)) for i, t in enumerate(args) if t is not None)
+    normalized_kwargs = ((k, _normalize_type(t)) for k, t in kwargs.items() if t is not None)
+    arg_types = tuple((i, t) for i, t in normalized_args if t)
+    kwarg_types = tuple((k, t) for k, t in normalized_kwargs if t)
+
+    def decorator(f):
+
+        # Nothing to check; the function is returned as is, with no wrapper overhead;
+        if not enabled or (not arg_types and not kwarg_types):
+            return f
+
+        # The signature is inspected once, at decoration time, rather than on every call;
+        # for plain functions the positional argument names are read off the code object,
+        # whereas other callables (e.g. classes, callable instances or bound methods) go
+        # through the full inspection, which already leaves out their bound argument.
+        if inspect.isfunction(f):
+            code = f.__code__
+            argument_names = code.co_varnames[:code.co_argcount]
+        else:
+            code = None
+            argument_names = tuple(
+                name for name, parameter in inspect.signature(f).parameters.items()
+                if parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD)
+            )
+
+        # The first argument of a plain function is exempt from the check for instance
+        # and class methods, as it always refers to the instance and class, respectively;
+        # these are recognised by the conventional naming of their first argument.
+        skip_first = code is not None and bool(argument_names) and argument_names[0] in ('self', 'cls')
+        argument_names = argument_names[1:] if skip_first else argument_names
+        offset = 1 if skip_first else 0
+
+        # Functions only taking variable positional arguments, such as the wrappers of
+        # other decorators, have their arguments identified by index, and whether the
+        # first one is exempt is determined upon each call.
+        if code is not None and not skip_first and not argument_names and code.co_flags & inspect.CO_VARARGS:
+            argument_names = tuple(range(len(args)))
+            offset = None
+
+        # Both positional and keyword checks are fused into a single wrapper, generated
+        # once per decorated function from these precomputed structures.
+        checks_pos = tuple(
+            (i, argument_names[i], valid_types)
+            for i, valid_types in arg_types
+            if i < len(argument_names)
+        )
+        return _compile_wrapper(f, checks_pos, offset, kwarg_types, on_invalid)
+
+    return decorator
+
+
+def typecheck(*args, **kwargs):
 
     """
     A decorator to enforce types of the arguments and keyword arguments of a
@@ -121,14 +366,10 @@ class typecheck(_typecheck):
             InvalidArgumentType: ...
     """
 
-    def __init__(self, *args, **kwargs):
-        super(typecheck, self).__init__(self._on_invalid, *args, **kwargs)
+    return _typecheck(_raise_on_invalid, *args, **kwargs)
 
-    def _on_invalid(self, argument, argumentIndexOrName, validTypes):
-        raise InvalidArgumentType(argumentIndexOrName, argument, validTypes)
 
-
-class typecheck_plus(_typecheck):
+def typecheck_plus(on_invalid, *args, **kwargs):
 
     """
     A decorator to enforce types of the arguments and keyword arguments of a
@@ -165,4 +406,6 @@ class typecheck_plus(_typecheck):
 
         >>> x == None
             True
-    """
\ No newline at end of file
+    """
+
+    return _typecheck(on_invalid, *args, **kwargs)